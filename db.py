@@ -1,50 +1,759 @@
+import atexit
+import io
 import json
+import math
+import mmap
 import os
-from datetime import datetime, date
+import sys
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Single-bill lookups fall back to a full read
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:  # Paid-bills logs stay uncompressed
+    zstandard = None
+
+try:
+    import ormsgpack
+except ImportError:  # Only needed for .msgpack files
+    ormsgpack = None
+
+# Files larger than this are parsed straight from a memory map instead of being read into bytes first
+MMAP_THRESHOLD = 64 * 1024
+
+# Logs are rewritten without deleted records once they hold more dead lines than this (or than live records)
+COMPACT_MIN_DEAD = 64
+
+# Buffer size for files written in many small pieces, so they reach the kernel in few syscalls
+WRITE_BUFFER = 1 << 20
+
+# Once the uncompressed tail of a log grows past this, it is merged into the compressed segment
+HOT_TAIL_LIMIT = 64 * 1024
+
+# One single-worker writer per database path, so writes to a file never overlap or reorder
+_writers = {}
+_writers_lock = threading.Lock()
+
+# Managers whose background writes have not been checked by flush() yet
+_unflushed = set()
+
+
+def _writer_for(path: str) -> ThreadPoolExecutor:
+    """
+    Returns the background writer thread for the given path, creating it on first use.
+    """
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        return writer
+
+
+@atexit.register
+def _flush_all() -> None:
+    """
+    Flushes every manager with unchecked writes at exit, so a failed background
+    write is reported instead of being lost silently.
+    Each failure is printed to stderr and the remaining managers are still flushed.
+    An atexit hook cannot change the exit status; scripts that need it call flush().
+    """
+    for manager in list(_unflushed):
+        try:
+            manager.flush()
+        except Exception:
+            print(f"Failed to save {manager.path}:", file=sys.stderr)
+            traceback.print_exc()
+
+
+def _default(obj):
+    """
+    Fallback serializer for the standard json module (dates as ISO strings).
+    """
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _loads(raw: bytes):
+    """
+    Parses raw JSON bytes, using orjson when it is available.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _dumps(data) -> bytes:
+    """
+    Serializes data to compact UTF-8 JSON bytes, using orjson when it is available.
+    This is the runtime format; see _dumps_pretty for human-readable output.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_DATACLASS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _dumps_pretty(data) -> bytes:
+    """
+    Serializes data to indented UTF-8 JSON bytes, for exports and debugging.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_DATACLASS
+        )
+    return json.dumps(data, indent=2, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _dumps_line(record) -> bytes:
+    """
+    Serializes a record to a single line of compact UTF-8 JSON, including the trailing newline.
+    """
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(record, ensure_ascii=False, default=_default).encode("utf-8") + b"\n"
+
+
+def _release(counts: Counter, key) -> None:
+    """
+    Removes one occurrence of key from a dedup counter, dropping the key at zero.
+    """
+    if counts[key] > 1:
+        counts[key] -= 1
+    else:
+        counts.pop(key, None)
+
+
+def _compile_record_encoder(fields: tuple):
+    """
+    Generates a JSON encoder specialized for records with exactly the given
+    (name, type) fields, emitted in that order with compact separators.
+    The generated function raises KeyError or TypeError for records that do not
+    match the schema, so callers can fall back to the generic encoder.
+    """
+    names = [name for name, _ in fields]
+    template, args, checks = [], [], [f"len(b) != {len(fields)}"]
+    for i, (name, kind) in enumerate(fields):
+        template.append(("{" if i == 0 else ",") + json.dumps(name).replace("%", "%%") + ":")
+        if kind is str:
+            template.append("%s")
+            args.append(f"_str(v{i})")
+        elif kind is bool:
+            template.append("%s")
+            args.append(f'("true" if v{i} else "false")')
+            checks.append(f"type(v{i}) is not bool")
+        else:  # int or float
+            template.append("%r")
+            args.append(f"v{i}")
+            checks.append(f"type(v{i}) not in _NUMBER")
+            if kind is float:
+                # %r writes nan/inf, which is not JSON
+                checks.append(f"(type(v{i}) is float and not _isfinite(v{i}))")
+    template.append("}")
+
+    src = (
+        "def encode(b):\n"
+        f"    {', '.join(f'v{i}' for i in range(len(names)))}, = "
+        f"{', '.join(f'b[{name!r}]' for name in names)},\n"
+        f"    if {' or '.join(checks)}:\n"
+        "        raise TypeError('record does not match the schema')\n"
+        f"    return {''.join(template)!r} % ({', '.join(args)},)\n"
+    )
+    ns = {"_str": json.encoder.encode_basestring, "_NUMBER": (int, float), "_isfinite": math.isfinite}
+    exec(compile(src, "<record encoder>", "exec"), ns)
+    return ns["encode"]
+
+
+def _unpack(raw: bytes):
+    """
+    Parses raw MessagePack bytes.
+    """
+    return ormsgpack.unpackb(raw, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+def _pack(data) -> bytes:
+    """
+    Serializes data to MessagePack bytes.
+    """
+    return ormsgpack.packb(data, option=ormsgpack.OPT_NON_STR_KEYS)
+
 
 class JsonManager:
     def __init__(self, path, key):
         """
         Base class for handling JSON file operations.
         Ensures that the directory for the JSON file exists.
+        Paths ending in ".msgpack" are stored as MessagePack instead of JSON.
         :param path: Path to the JSON file
         :param key: Key name for storing items in JSON
         """
         self.path = path
         self.key = key
+        self.binary = path.endswith(".msgpack")
+        if self.binary:
+            if ormsgpack is None:
+                raise ImportError("ormsgpack is required to use a .msgpack database file")
+            self._decode, self._encode = _unpack, _pack
+        else:
+            self._decode, self._encode = _loads, _dumps
+        self._cache = None  # Last parsed content of the file
+        self._mtime = None  # Modification time (ns) of the file when it was cached
+        self._buffered = 0  # Nesting depth of buffered() blocks
+        self._dirty = False  # True when the cache has changes not yet written to disk
+        self._pending = []  # Futures of writes handed to the background writer and not yet checked
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
 
     def read_json(self) -> dict:
         """
         Reads the JSON file and returns its data.
+        The parsed data is cached and only reloaded when the file changes on disk,
+        so callers can mutate the returned dict in place before writing it back.
         If the file does not exist or has an invalid format, it returns an empty structure.
+        The "_next_id" counter is added to files written before it existed.
         """
-        if not os.path.exists(self.path):
-            return {self.key: {}}
+        # _writing() goes first: it marks the cache dirty again after a failed write
+        if self._writing() or self._dirty:
+            return self._cache
 
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if self.key not in data:
-                    data[self.key] = {}
-                return data
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {self.key: {}}
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {self.key: {}, "_next_id": 1}
+
+        if self._cache is not None and st.st_mtime_ns == self._mtime:
+            return self._cache
+
+        try:
+            with open(self.path, "rb") as f:
+                data = self._load_file(f, st.st_size)
+                # IDs are stored as strings in JSON but kept as ints in memory
+                data[self.key] = {int(k): v for k, v in data.get(self.key, {}).items()}
+                if "_next_id" not in data:
+                    data["_next_id"] = max(data[self.key], default=0) + 1
+        except (ValueError, FileNotFoundError):
+            return {self.key: {}, "_next_id": 1}
+
+        self._cache = data
+        self._mtime = st.st_mtime_ns
+        return data
+
+    def _fresh_cache(self):
+        """
+        Returns the cached data if it still matches the file on disk, otherwise None.
+        """
+        if self._writing() or self._dirty or self._cache is None:
+            return self._cache
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return self._cache if st.st_mtime_ns == self._mtime else None
+
+    def _writing(self) -> bool:
+        """
+        True while a background write is still in progress.
+        A failed write marks the cache dirty again so it is retried by the next
+        write; its error is only raised by flush(), never by a read or a write.
+        """
+        writing = False
+        for future in self._pending:
+            if not future.done():
+                writing = True
+            elif future.exception() is not None:
+                self._dirty = True
+        return writing
+
+    def _collect_failed(self):
+        """
+        Forgets finished writes and returns the error of the last failed one, if any.
+        A failure marks the cache dirty again so it is written by the next flush.
+        """
+        error = None
+        for future in self._pending:
+            if future.done() and future.exception() is not None:
+                error = future.exception()
+        self._pending = [future for future in self._pending if not future.done()]
+        if error is not None:
+            self._dirty = True
+        return error
+
+    def _can_stream(self) -> bool:
+        """
+        True when the file can be queried with ijson instead of being fully parsed.
+        """
+        return ijson is not None and not self.binary
+
+    def _load_file(self, f, size: int):
+        """
+        Parses an open binary database file of the given size.
+        Large files are memory-mapped and parsed without an intermediate copy
+        when the decoder supports buffer objects (orjson and ormsgpack do).
+        """
+        if size > MMAP_THRESHOLD and (self.binary or orjson is not None):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return self._decode(view)
+        return self._decode(f.read())
 
     def write_json(self, data: dict) -> None:
         """
-        Writes data to the JSON file, ensuring proper indentation and encoding.
+        Writes data to the JSON file in compact UTF-8 form.
+        Inside a buffered() block the write is deferred until the block exits.
+        """
+        self._cache = data
+        self._dirty = True
+        if self._buffered == 0:
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+        Serializes the cached data and hands the disk write to the background writer.
+        The caller returns immediately; use flush() to wait for the write.
+        An earlier failed write is not raised here: this write carries the whole
+        document, so it retries that data too. Errors are reported by flush().
+        """
+        self._collect_failed()
+        buf = self._encode(self._cache)
+        self._dirty = False
+        _unflushed.add(self)
+        try:
+            future = _writer_for(self.path).submit(self._atomic_replace, buf)
+        except RuntimeError:  # The interpreter is shutting down, write synchronously
+            future = None
+        if future is not None:
+            self._pending.append(future)
+            return
+        try:
+            self._atomic_replace(buf)
+        except BaseException:
+            self._dirty = True
+            raise
+
+    def _atomic_replace(self, buf: bytes) -> None:
+        """
+        Writes the serialized data to a temporary file that then replaces the original,
+        so a crash mid-write never leaves a truncated JSON file behind.
+        Runs on the background writer thread.
+        """
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def flush(self) -> None:
+        """
+        Writes any unsaved changes and waits until they are on disk.
+        Data from an earlier failed write is written again; errors from the
+        background write are raised here.
+        """
+        wait(self._pending)
+        self._collect_failed()  # Marks the cache dirty again, so it is retried below
+        if self._dirty:
+            self._flush()
+            wait(self._pending)
+            error = self._collect_failed()
+            if error is not None:
+                raise error
+        _unflushed.discard(self)
+
+    @contextmanager
+    def buffered(self):
+        """
+        Defers all writes made inside the block and writes the file once on exit,
+        waiting for the write to finish. Blocks can be nested; only the outermost one writes.
+        If the block raises, nothing is written and the exception propagates unchanged;
+        the changes stay in memory and go out with the next write or flush().
+
+        Example:
+            with bills.buffered():
+                for bill in batch:
+                    bills.add_bill(**bill)
+        """
+        self._buffered += 1
+        try:
+            yield self
+        except BaseException:
+            self._buffered -= 1
+            raise
+        self._buffered -= 1
+        if self._buffered == 0:
+            self.flush()
+
+    def write_json_pretty(self, path: str) -> None:
+        """
+        Exports the current data as indented JSON, for inspection or debugging.
+        The database file itself is always written compact.
+
+        :param path: Path of the exported JSON file
+        """
+        data = self.read_json()
+        with open(path, "wb") as f:
+            f.write(_dumps_pretty(data))
+
+class JsonLogManager:
+    def __init__(self, path, key, legacy_path=None):
+        """
+        Base class for append-only JSON Lines files.
+        Each line holds one record with its "id"; deleting a record appends a
+        tombstone line ({"id": ..., "deleted": true}) instead of rewriting the file.
+        When zstandard is installed, compaction merges the log into a compressed
+        "cold" segment (path + ".zst") and leaves the plain file as a small "hot" tail.
+        A JSON document in the JsonManager format ({key: {id: record}}) found at
+        path, or at legacy_path while no log exists yet, is imported once.
+        Ensures that the directory for the file exists.
+        :param path: Path to the JSON Lines file
+        :param key: Key name of the records in the legacy JSON document
+        :param legacy_path: Path of a JSON document to import when the log does not exist
+        """
+        self.path = path
+        self.key = key
+        self.legacy_path = legacy_path
+        self.cold_path = path + ".zst"
+        self._records = None  # Live records by ID, loaded from the log on first use
+        self._next_id = 1
+        self._dead = 0  # Lines in the log that no longer describe a live record
+        self._parsed = 0  # Lines read from the log that could be parsed
+        self._hot_size = 0  # Size in bytes of the uncompressed hot tail
+        self._unreadable = False  # True when the log had lines but none of them parsed
+        self._fh = None  # Append handle, opened on the first write
+        self._torn = False  # True when the log does not end with a newline
+        self._signature_seen = None  # _signature() of the files when they were last read
+        self._version = 0  # Incremented whenever lines are replayed from disk
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _replay(self, lines, records: dict) -> None:
+        """
+        Applies the lines of a log segment to the records dict.
+        Lines that cannot be used (a torn last line after a crash, JSON that is
+        not an object, a missing or non-integer id) are skipped and counted as dead.
+        """
+        for line in lines:
+            # A last line without newline was torn; start the next append on a fresh line
+            self._torn = not line.endswith(b"\n")
+            if not line.strip():
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                self._dead += 1
+                continue
+            if not isinstance(record, dict):
+                self._dead += 1  # Valid JSON, but not a record
+                continue
+            self._parsed += 1
+            if "_next_id" in record:
+                if isinstance(record["_next_id"], int):
+                    self._next_id = max(self._next_id, record["_next_id"])
+                else:
+                    self._dead += 1
+                continue
+            record_id = record.pop("id", None)
+            if not isinstance(record_id, int) or isinstance(record_id, bool):
+                self._dead += 1
+                continue
+            self._next_id = max(self._next_id, record_id + 1)
+            if record.get("deleted"):
+                self._dead += 1 + (records.pop(record_id, None) is not None)
+            else:
+                records[record_id] = self._prepare(record)
+
+    def _prepare(self, record: dict) -> dict:
+        """
+        Converts a record replayed from disk to its in-memory form. Subclasses
+        override it to decode field values once, instead of on every read.
+        """
+        return record
+
+    def _signature(self) -> tuple:
+        """
+        Returns (inode, size, mtime) of the cold segment and of the hot tail, None for a missing file.
+        """
+        signature = []
+        for path in (self.cold_path, self.path):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    def read_records(self) -> dict:
+        """
+        Returns the live records by ID, replaying the cold segment and then the
+        hot tail on first use.
+        The files are checked on every call: lines appended by another manager or
+        process are replayed from where this one stopped, and any other change
+        (e.g. a compaction elsewhere) reloads the whole log.
+        """
+        signature = self._signature()
+        if self._records is not None and signature == self._signature_seen:
+            return self._records
+
+        if self._records is not None and self._signature_seen is not None:
+            cold, hot = signature
+            seen_cold, seen_hot = self._signature_seen
+            if cold == seen_cold and hot and seen_hot and hot[0] == seen_hot[0] and hot[1] > self._hot_size:
+                with open(self.path, "rb") as f:
+                    f.seek(self._hot_size)
+                    self._replay(f, self._records)
+                    self._hot_size = f.tell()
+                self._signature_seen = signature
+                self._version += 1
+                return self._records
+
+        self._load(signature)
+        return self._records
+
+    def _load(self, signature: tuple) -> None:
+        """
+        Replays the whole log from scratch, importing a legacy JSON document if there is one.
+        :param signature: File signature taken before reading
+        """
+        self.close()  # The hot tail may have been replaced since it was opened
+        self._records = None
+        self._next_id = 1
+        self._dead = 0
+        self._parsed = 0
+        self._hot_size = 0
+        self._torn = False
+        self._version += 1
+
+        if not os.path.exists(self.cold_path):
+            if os.path.exists(self.path):
+                legacy = self._read_legacy(self.path)
+            elif self.legacy_path is not None and os.path.exists(self.legacy_path):
+                legacy = self._read_legacy(self.legacy_path)
+            else:
+                legacy = None
+            if legacy is not None:
+                # Rewrite the imported records as a log; the legacy file at legacy_path is left as is
+                self._records, self._next_id = legacy
+                self._compact()
+                return
+
+        records = {}
+        if os.path.exists(self.cold_path):
+            if zstandard is None:
+                raise ImportError(f"zstandard is required to read {self.cold_path}")
+            with open(self.cold_path, "rb") as f:
+                with io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f)) as reader:
+                    self._replay(reader, records)
+            self._torn = False
+
+        try:
+            with open(self.path, "rb") as f:
+                self._replay(f, records)
+                self._hot_size = f.tell()
+        except FileNotFoundError:
+            pass
+
+        self._records = records
+        self._signature_seen = signature
+        self._unreadable = self._parsed == 0 and self._dead > 0
+        if self._needs_compaction():
+            self._compact()
+
+    def _read_legacy(self, path: str):
+        """
+        Reads a JSON document of the form {key: {id: record}} from path.
+        :return: (records, next_id), or None if the file is not such a document
+        """
+        with open(path, "rb") as f:
+            try:
+                head = _loads(f.readline())
+            except ValueError:
+                head = None  # A pretty-printed document does not parse line by line
+            if isinstance(head, dict) and self.key not in head:
+                return None  # A regular log line
+            f.seek(0)
+            try:
+                doc = _loads(f.read())
+            except ValueError:
+                return None
+        if not isinstance(doc, dict) or not isinstance(doc.get(self.key), dict):
+            return None
+        records = {int(k): v for k, v in doc[self.key].items()}
+        next_id = doc.get("_next_id", max(records, default=0) + 1)
+        return records, next_id
+
+    def _needs_compaction(self) -> bool:
+        """
+        True when the log holds too many dead lines, or the hot tail has grown
+        large enough to be merged into the compressed cold segment.
+        A file in which no line could be parsed is never compacted, since that
+        would throw away whatever it holds.
+        """
+        if self._unreadable:
+            return False
+        if self._dead > max(COMPACT_MIN_DEAD, len(self._records)):
+            return True
+        return zstandard is not None and self._hot_size > HOT_TAIL_LIMIT
+
+    def _append(self, line: dict) -> None:
+        """
+        Appends a single line to the hot tail.
+        """
+        if self._fh is None:
+            self._fh = open(self.path, "ab")
+        buf = _dumps_line(line)
+        if self._torn:
+            buf = b"\n" + buf
+            self._torn = False
+        self._fh.write(buf)
+        self._fh.flush()
+        self._hot_size += len(buf)
+        signature = self._signature()
+        # If the tail grew by more than this line, someone else appended too; reload next time
+        self._signature_seen = signature if signature[1] and signature[1][1] == self._hot_size else None
+
+    def append_record(self, record: dict) -> int:
+        """
+        Stores a new record under the next free ID and returns that ID.
+        """
+        records = self.read_records()
+        new_id = self._next_id
+        self._next_id += 1
+        self._append({"id": new_id, **record})
+        records[new_id] = record
+        if self._needs_compaction():
+            self._compact()
+        return new_id
+
+    def delete_record(self, record_id: int) -> bool:
+        """
+        Deletes a record by its ID.
+        :return: True if the record was deleted, False if not found
         """
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        records = self.read_records()
+        if record_id not in records:
+            return False  # ID not found
+
+        self._append({"id": record_id, "deleted": True})
+        del records[record_id]
+        self._dead += 2
+        if self._needs_compaction():
+            self._compact()
+        return True
+
+    def compact(self) -> None:
+        """
+        Rewrites the log with only the live records, dropping tombstones.
+        With zstandard the records go to the compressed cold segment and the hot
+        tail is emptied; otherwise the plain log is rewritten in place.
+        The ID counter is kept in a header line so deleted IDs are never reused.
+        The log is re-read first, so lines written by others are kept.
+        """
+        self.read_records()
+        self._compact()
+
+    def _compact(self) -> None:
+        """
+        Rewrites the log from the in-memory records, which must be up to date.
+        """
+        records = self._records
+        self.close()
+        target = self.cold_path if zstandard is not None else self.path
+        tmp = target + ".tmp"
+        with open(tmp, "wb", buffering=WRITE_BUFFER) as f:
+            out = f
+            if zstandard is not None:
+                out = zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False)
+            out.write(_dumps_line({"_next_id": self._next_id}))
+            for record_id, record in records.items():
+                out.write(_dumps_line({"id": record_id, **record}))
+            if out is not f:
+                out.close()
+        os.replace(tmp, target)
+        if target != self.path:
+            # Replaying the old tail over the new cold segment is harmless,
+            # so a crash before this truncation loses nothing
+            open(self.path, "wb").close()
+        self._dead = 0
+        self._unreadable = False
+        self._hot_size = 0
+        self._torn = False
+        self._signature_seen = self._signature()
+
+    def close(self) -> None:
+        """
+        Closes the append handle, if open.
+        """
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
 
 class RegisteredBills(JsonManager):
-    def __init__(self, path='db/registered_bills.json'):
+    # Fixed schema of a bill record, used to generate its serializer
+    FIELDS = (("name", str), ("value", float), ("due_date", int), ("monthly_bill", bool))
+
+    def __init__(self, path='db/registered_bills.json', dedup=False):
         """
         Initializes the database manager with a given JSON file path.
         Ensures that the directory for the JSON file exists.
+        Without orjson, a serializer specialized for FIELDS replaces the generic json encoder.
+        :param dedup: If True, adding a bill identical to an existing one is a no-op
         """
         super().__init__(path, "registered_bills")
+        self.dedup = dedup
+        self._dedup = None  # Count of stored bills per (name, value, due_date, monthly_bill)
+        self._dedup_data = None  # Document the dedup counts were built from
+        if not self.binary and orjson is None:
+            self._encode_bill = _compile_record_encoder(self.FIELDS)
+            self._encode = self._encode_document
+
+    def _encode_document(self, data: dict) -> bytes:
+        """
+        Serializes the bills document with the generated record encoder.
+        Records that do not match FIELDS go through the generic encoder.
+        """
+        encode_bill = self._encode_bill
+        parts = []
+        for bill_id, bill in data[self.key].items():
+            try:
+                parts.append('"%d":%s' % (bill_id, encode_bill(bill)))
+            except (KeyError, TypeError):
+                parts.append('"%d":%s' % (bill_id, json.dumps(bill, ensure_ascii=False, default=_default)))
+        extra = "".join(
+            ",%s:%s" % (json.dumps(k), json.dumps(v, ensure_ascii=False, default=_default))
+            for k, v in data.items() if k != self.key
+        )
+        return ('{"%s":{%s}%s}' % (self.key, ",".join(parts), extra)).encode("utf-8")
+
+    @staticmethod
+    def _bill_key(bill: dict) -> tuple:
+        """
+        Returns the tuple that identifies duplicate bills.
+        """
+        return (bill.get("name"), bill.get("value"), bill.get("due_date"), bill.get("monthly_bill"))
+
+    def _dedup_counts(self, data: dict) -> Counter:
+        """
+        Returns how many stored bills share each key, rebuilding it when the document was reloaded.
+        A key is only free again once its count drops to zero.
+        """
+        if self._dedup_data is not data:
+            self._dedup = Counter(self._bill_key(bill) for bill in data[self.key].values())
+            self._dedup_data = data
+        return self._dedup
 
     def read_bills(self) -> list:
         """
@@ -53,6 +762,49 @@ class RegisteredBills(JsonManager):
         return self.read_json().get(self.key, {})
 
 
+    def get_bill(self, id_bill: int):
+        """
+        Returns a single bill by its ID, or None if not found.
+        When the file is not cached, it is streamed with ijson and parsing stops at the match.
+
+        :param id_bill: ID of the bill
+        """
+        data = self._fresh_cache()
+        if data is None and not self._can_stream():
+            data = self.read_json()
+        if data is not None:
+            return data[self.key].get(id_bill)
+
+        try:
+            with open(self.path, "rb") as f:
+                for bill in ijson.items(f, f"{self.key}.{id_bill}", use_float=True):
+                    return bill
+        except (ijson.JSONError, FileNotFoundError):
+            pass
+        return None
+
+
+    def iter_bills(self):
+        """
+        Yields (id, bill) pairs one at a time.
+        When the file is not cached, it is streamed with ijson so memory use stays constant.
+        Cached bills are iterated over a snapshot, so bills can be added or deleted inside the loop.
+        """
+        data = self._fresh_cache()
+        if data is None and not self._can_stream():
+            data = self.read_json()
+        if data is not None:
+            yield from list(data[self.key].items())
+            return
+
+        try:
+            with open(self.path, "rb") as f:
+                for bill_id, bill in ijson.kvitems(f, self.key, use_float=True):
+                    yield int(bill_id), bill
+        except (ijson.JSONError, FileNotFoundError):
+            return
+
+
     def add_bill(self, name: str, value: float, due_day: int, monthly_bill: bool) -> list:
         """
         Adds a new bill to the JSON file.
@@ -66,8 +818,13 @@ class RegisteredBills(JsonManager):
         data = self.read_json()
         bills = data[self.key]
 
+        key = (name, value, due_day, monthly_bill)
+        if self.dedup and self._dedup_counts(data)[key] > 0:
+            return bills  # Same bill already stored, nothing to write
+
         # Generate a unique ID
-        new_id = new_id = str(max(map(int, bills.keys()), default=0) + 1)
+        new_id = data["_next_id"]
+        data["_next_id"] += 1
 
         # Create new bill
         new_bill = {
@@ -77,13 +834,15 @@ class RegisteredBills(JsonManager):
             "monthly_bill": monthly_bill
         }
 
-        data[self.key][new_id] = new_bill
+        bills[new_id] = new_bill
+        if self._dedup_data is data:
+            self._dedup[key] += 1
         self.write_json(data)
 
         return data[self.key]
 
 
-    def delete_bill(self, id_bill: str) -> bool:
+    def delete_bill(self, id_bill: int) -> bool:
         """
         Deletes a bill by its ID from the JSON file.
 
@@ -96,6 +855,8 @@ class RegisteredBills(JsonManager):
         if id_bill not in bills:
             return False  # Bill ID not found
 
+        if self._dedup_data is data:
+            _release(self._dedup, self._bill_key(bills[id_bill]))
         del data[self.key][id_bill]
 
         self.write_json(data)
@@ -103,60 +864,102 @@ class RegisteredBills(JsonManager):
         return True
 
 
-class PaidBills(JsonManager):
-    def __init__(self, path='db/paid_bills.json'):
+class PaidBills(JsonLogManager):
+    def __init__(self, path='db/paid_bills.jsonl', dedup=False):
         """
-        Initializes the database manager with a given JSON file path.
-        Ensures that the directory for the JSON file exists.
+        Initializes the database manager with a given JSON Lines file path.
+        Ensures that the directory for the file exists.
+        Data from the older paid_bills.json next to it is imported on first use.
+        :param dedup: If True, paying the same bill twice on the same date is a no-op
+        """
+        legacy_path = os.path.splitext(path)[0] + ".json" if path.endswith(".jsonl") else None
+        super().__init__(path, "paid_bills", legacy_path)
+        self.dedup = dedup
+        self._dedup = None  # Count of stored payments per (id_bill, ISO payment date)
+        self._dedup_version = None  # Log version the dedup counts were built from
+
+    @staticmethod
+    def _payment_key(id_bill, payment_date) -> tuple:
         """
-        super().__init__(path, "paid_bills")
+        Returns the tuple that identifies duplicate payments.
+        """
+        if isinstance(payment_date, date):
+            payment_date = payment_date.isoformat()
+        return (id_bill, payment_date)
+
+    def _dedup_counts(self) -> Counter:
+        """
+        Returns how many stored payments share each key, rebuilding it when the log was re-read.
+        A key is only free again once its count drops to zero.
+        """
+        records = self.read_records()
+        if self._dedup_version != self._version:
+            self._dedup = Counter(
+                self._payment_key(bill.get("id_bill"), bill.get("payment_date"))
+                for bill in records.values()
+            )
+            self._dedup_version = self._version
+        return self._dedup
+
+    def _prepare(self, record: dict) -> dict:
+        """
+        Stores payment_date in memory as a date object, as pay_bill does.
+        Invalid values are kept as they are, so compaction never rewrites them.
+        """
+        payment_date = record.get("payment_date")
+        if isinstance(payment_date, str):
+            try:
+                record["payment_date"] = date.fromisoformat(payment_date)
+            except ValueError:
+                pass
+        return record
 
     def read_paid_bills(self) -> dict:
         """
         Retrieves all paid bills and converts the payment_date back to a date object.
+        The records are copied so the in-memory log keeps the stored values.
         """
-        data = self.read_json()
-        for bill_id, bill in data[self.key].items():
+        fromisoformat = date.fromisoformat  # Local alias avoids the attribute lookup per record
+        paid_bills = {}
+        for bill_id, bill in self.read_records().items():
+            bill = bill.copy()
             try:
-                bill["payment_date"] = datetime.strptime(bill["payment_date"], "%Y-%m-%d").date()
-            except (ValueError, KeyError):
+                payment_date = bill["payment_date"]
+                if not isinstance(payment_date, date):
+                    bill["payment_date"] = fromisoformat(payment_date)
+            except (KeyError, ValueError, TypeError):
                 bill["payment_date"] = None  # Avoid crashing if the date format is wrong
-        return data[self.key]
+            paid_bills[bill_id] = bill
+        return paid_bills
 
 
-    def pay_bill(self, id_bill: str, date_of_payment: date) -> dict:
+    def pay_bill(self, id_bill: int, date_of_payment: date) -> dict:
         """
-        Adds a record of a bill payment to the JSON file.
+        Appends a record of a bill payment to the log file.
+        :return: Read-only view of the paid bills by ID (not a copy, so this stays O(1))
         """
-        data = self.read_json()
-        paid_bills = data[self.key]
-
-        # Generate a unique ID
-        new_id = str(max(map(int, paid_bills.keys()), default=0) + 1)
+        key = self._payment_key(id_bill, date_of_payment)
+        if self.dedup and self._dedup_counts()[key] > 0:
+            return MappingProxyType(self.read_records())  # Payment already recorded, nothing to write
 
         # Create new paid bill
         new_paid_bill = {
             "id_bill": id_bill,
-            "payment_date": date_of_payment.strftime("%Y-%m-%d")
+            "payment_date": date_of_payment
         }
 
-        data[self.key][new_id] = new_paid_bill
-        self.write_json(data)
+        self.append_record(new_paid_bill)
+        if self._dedup_version == self._version:
+            self._dedup[key] += 1  # Only once the payment is actually in the log
 
-        return data[self.key]
+        return MappingProxyType(self.read_records())
 
 
-    def delete_paid_bill(self, id_paid_bill: str) -> bool:
+    def delete_paid_bill(self, id_paid_bill: int) -> bool:
         """
-        Deletes a bill payment record by its ID from the JSON file.
+        Deletes a bill payment record by its ID, appending a tombstone to the log file.
         """
-        data = self.read_json()
-        paid_bills = data[self.key]
-
-        if id_paid_bill not in paid_bills:
-            return False  # ID not found
-
-        del data[self.key][id_paid_bill]
-        self.write_json(data)
-
-        return True
+        bill = self.read_records().get(id_paid_bill)
+        if bill is not None and self._dedup_version == self._version:
+            _release(self._dedup, self._payment_key(bill.get("id_bill"), bill.get("payment_date")))
+        return self.delete_record(id_paid_bill)
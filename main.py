@@ -16,4 +16,6 @@ paid_bills_obj.read_paid_bills()
 
 paid_bills_obj.pay_bill(5,data)
 
-paid_bills_obj.delete_paid_bill("3")
+paid_bills_obj.delete_paid_bill(3)
+
+registered_bills_obj.flush()
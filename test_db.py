@@ -0,0 +1,242 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from datetime import date
+
+import db
+
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+
+class PaidBillsTest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = self.path("paid_bills.jsonl")
+
+    def manager(self) -> db.PaidBills:
+        paid = db.PaidBills(self.log)
+        self.addCleanup(paid.close)
+        return paid
+
+    def write(self, path: str, text: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_replay(self):
+        paid = self.manager()
+        paid.pay_bill(1, date(2025, 3, 13))
+        paid.pay_bill(2, date(2025, 3, 14))
+        paid.delete_paid_bill(1)
+        paid.close()
+
+        records = self.manager().read_paid_bills()
+        self.assertEqual(records, {2: {"id_bill": 2, "payment_date": date(2025, 3, 14)}})
+
+    def test_deleted_ids_are_not_reused(self):
+        paid = self.manager()
+        paid.pay_bill(1, date(2025, 3, 13))
+        paid.delete_paid_bill(1)
+        paid.compact()
+
+        reopened = self.manager()
+        reopened.pay_bill(2, date(2025, 3, 14))
+        self.assertEqual(list(reopened.read_records()), [2])
+
+    def test_pay_bill_returns_read_only_view(self):
+        paid = self.manager()
+        view = paid.pay_bill(1, date(2025, 3, 13))
+        self.assertEqual(view[1]["payment_date"], date(2025, 3, 13))
+        with self.assertRaises(TypeError):
+            view[2] = {}
+
+    def test_incremental_reread(self):
+        a = self.manager()
+        b = self.manager()
+        a.pay_bill(1, date(2025, 3, 13))
+        b.pay_bill(2, date(2025, 3, 13))
+        a.pay_bill(3, date(2025, 3, 13))
+
+        expected = {1: 1, 2: 2, 3: 3}
+        for manager in (a, b, self.manager()):
+            records = manager.read_records()
+            self.assertEqual({k: v["id_bill"] for k, v in records.items()}, expected)
+
+    def test_compaction_keeps_records_of_other_writers(self):
+        a = self.manager()
+        b = self.manager()
+        a.pay_bill(1, date(2025, 3, 13))
+        b.pay_bill(2, date(2025, 3, 13))
+        a.compact()
+
+        records = self.manager().read_records()
+        self.assertEqual(sorted(v["id_bill"] for v in records.values()), [1, 2])
+
+    def test_compaction_without_zstandard(self):
+        saved, db.zstandard = db.zstandard, None
+        self.addCleanup(setattr, db, "zstandard", saved)
+
+        paid = self.manager()
+        for i in range(db.COMPACT_MIN_DEAD + 1):
+            paid.pay_bill(i, date(2025, 3, 13))
+            paid.delete_paid_bill(i + 1)
+        paid.pay_bill(99, date(2025, 3, 13))
+        paid.close()
+
+        with open(self.log, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertLess(len(lines), 2 * db.COMPACT_MIN_DEAD)
+        records = self.manager().read_records()
+        self.assertEqual([v["id_bill"] for v in records.values()], [99])
+
+    def test_legacy_import(self):
+        legacy = self.path("paid_bills.json")
+        self.write(legacy, '{\n  "paid_bills": {\n    "1": {"id_bill": 1, "payment_date": "2025-03-13"},\n'
+                           '    "4": {"id_bill": 2, "payment_date": "2025-03-14"}\n  }\n}\n')
+
+        paid = self.manager()
+        self.assertEqual(sorted(paid.read_records()), [1, 4])
+        self.assertEqual(paid.append_record({"id_bill": 3, "payment_date": "2025-03-15"}), 5)
+        self.assertTrue(os.path.exists(legacy))  # The legacy file is left as is
+
+    def test_legacy_document_at_log_path(self):
+        self.write(self.log, '{"paid_bills": {"7": {"id_bill": 1, "payment_date": "2025-03-13"}}}')
+
+        paid = self.manager()
+        self.assertEqual(list(paid.read_paid_bills()), [7])
+        self.assertEqual(list(self.manager().read_records()), [7])
+
+    def test_unreadable_log_is_not_compacted(self):
+        garbage = "not json\n" * (db.COMPACT_MIN_DEAD + 1)
+        self.write(self.log, garbage)
+
+        paid = self.manager()
+        self.assertEqual(paid.read_records(), {})
+        paid.close()
+        with open(self.log, encoding="utf-8") as f:
+            self.assertEqual(f.read(), garbage)
+
+    def test_bad_lines_are_skipped(self):
+        self.write(self.log, '[1, 2]\n{"id": "1", "id_bill": 1}\n"text"\n'
+                             '{"id": 5, "id_bill": 5, "payment_date": "2025-03-13"}\n')
+
+        records = self.manager().read_records()
+        self.assertEqual(list(records), [5])
+
+    def test_torn_last_line(self):
+        self.write(self.log, '{"id": 1, "id_bill": 1, "payment_date": "2025-03-13"}\n{"id": 2, "id_b')
+
+        paid = self.manager()
+        self.assertEqual(list(paid.read_records()), [1])
+        paid.pay_bill(3, date(2025, 3, 14))
+        paid.close()
+        records = self.manager().read_records()
+        self.assertEqual(sorted(v["id_bill"] for v in records.values()), [1, 3])
+
+    def test_dedup_counts_duplicates(self):
+        paid = self.manager()
+        paid.pay_bill(1, date(2025, 3, 13))
+        paid.pay_bill(1, date(2025, 3, 13))
+        paid.dedup = True
+
+        paid.delete_paid_bill(1)
+        self.assertEqual(len(paid.pay_bill(1, date(2025, 3, 13))), 1)  # One copy is still stored
+        paid.delete_paid_bill(2)
+        self.assertEqual(len(paid.pay_bill(1, date(2025, 3, 13))), 1)
+
+
+class RegisteredBillsTest(TempDirTestCase):
+    def manager(self, name: str = "registered_bills.json") -> db.RegisteredBills:
+        return db.RegisteredBills(self.path(name))
+
+    def names(self, bills: db.RegisteredBills) -> list:
+        return sorted(bill["name"] for bill in bills.read_json()[bills.key].values())
+
+    def block_writes(self, bills: db.RegisteredBills) -> None:
+        """
+        Makes every write to the file fail until the test removes the directory
+        put in place of the temporary file, or the test ends.
+        """
+        os.mkdir(bills.path + ".tmp")
+
+        def unblock():
+            if os.path.isdir(bills.path + ".tmp"):
+                os.rmdir(bills.path + ".tmp")
+            bills.flush()  # Leaves nothing for the exit hook
+        self.addCleanup(unblock)
+
+    def test_write_failure_is_raised_by_flush_and_retried(self):
+        bills = self.manager()
+        bills.add_bill("a", 1.0, 1, True)
+        bills.flush()
+        self.block_writes(bills)
+
+        bills.add_bill("b", 2.0, 2, False)  # Fails in the background, never here
+        bills.add_bill("c", 3.0, 3, False)
+        self.assertEqual(self.names(bills), ["a", "b", "c"])  # Reads keep the unsaved data
+        with self.assertRaises(OSError):
+            bills.flush()
+        self.assertEqual(self.names(self.manager()), ["a"])
+
+        os.rmdir(bills.path + ".tmp")
+        bills.flush()
+        self.assertEqual(self.names(self.manager()), ["a", "b", "c"])
+
+    def test_exit_hook_reports_every_failed_manager(self):
+        first, second = self.manager("a.json"), self.manager("b.json")
+        for bills in (first, second):
+            self.block_writes(bills)
+            bills.add_bill("a", 1.0, 1, True)
+
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            db._flush_all()
+        self.assertIn(f"Failed to save {first.path}", stderr.getvalue())
+        self.assertIn(f"Failed to save {second.path}", stderr.getvalue())
+
+    def test_buffered_writes_once_on_exit(self):
+        bills = self.manager()
+        with bills.buffered():
+            with bills.buffered():
+                bills.add_bill("a", 1.0, 1, True)
+            self.assertFalse(os.path.exists(bills.path))
+            bills.add_bill("b", 2.0, 2, False)
+        self.assertEqual(self.names(self.manager()), ["a", "b"])
+
+    def test_buffered_block_that_raises_is_not_written(self):
+        bills = self.manager()
+        self.block_writes(bills)
+
+        with self.assertRaises(KeyError):  # Not the OSError a flush would raise
+            with bills.buffered():
+                bills.add_bill("a", 1.0, 1, True)
+                raise KeyError("batch")
+        self.assertFalse(os.path.exists(bills.path))
+        self.assertEqual(self.names(bills), ["a"])  # Still pending in memory
+
+    def test_dedup_counts_duplicates(self):
+        bills = self.manager()
+        bills.add_bill("a", 1.0, 1, True)
+        bills.add_bill("a", 1.0, 1, True)
+        bills.dedup = True
+
+        bills.delete_bill(1)
+        bills.add_bill("a", 1.0, 1, True)  # One copy is still stored
+        self.assertEqual(self.names(bills), ["a"])
+        bills.delete_bill(2)
+        bills.add_bill("a", 1.0, 1, True)
+        self.assertEqual(self.names(bills), ["a"])
+        bills.flush()
+
+
+if __name__ == "__main__":
+    unittest.main()